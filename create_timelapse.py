@@ -1,8 +1,16 @@
 import os
 import subprocess
-import re
 import json
-from datetime import datetime
+import sys
+import re
+import shutil
+import tempfile
+import time
+import heapq
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from operator import itemgetter
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -24,6 +32,8 @@ output_width = int(os.getenv('OUTPUT_WIDTH', '1920'))
 output_height = int(os.getenv('OUTPUT_HEIGHT', '1080'))
 output_video = os.getenv('OUTPUT_VIDEO', 'account_timelapse.mp4')
 video_quality = os.getenv('VIDEO_QUALITY', '23')
+# Encoder speed preset (empty = veryfast for libx264, p4 for NVENC)
+video_preset = os.getenv('VIDEO_PRESET', '')
 
 # Music file (optional)
 music_file = os.getenv('MUSIC_FILE', '')
@@ -36,6 +46,12 @@ elif not os.path.exists(music_file):
 # Music playback mode
 hold_last_frame = os.getenv('HOLD_LAST_FRAME', 'true').lower() == 'true'
 
+# Scan subfolders of SCREENSHOTS_DIR too (disable for a single flat folder)
+recursive = os.getenv('RECURSIVE', 'true').lower() == 'true'
+
+# Scan top-level subfolders concurrently (helps when they live on fast or separate drives)
+parallel_scan = os.getenv('PARALLEL_SCAN', 'false').lower() == 'true'
+
 # Chatbox blur settings
 # NOTE: Blur coordinates are based on a reference resolution of 765x503 (RuneLite fixed mode)
 # They will be automatically scaled to match OUTPUT_WIDTH and OUTPUT_HEIGHT
@@ -63,30 +79,75 @@ if blur_enabled:
         'h': int(blur_h_ref * scale_y)
     }
     blur_amount = int(os.getenv('BLUR_AMOUNT', '15'))
+    # Downscale factor for the cheap "shrink then stretch" blur (1 or less uses boxblur)
+    blur_downscale = int(os.getenv('BLUR_DOWNSCALE', '8'))
 else:
     blur_box = None
     blur_amount = 0
+    blur_downscale = 0
 
 # --- End of Configuration ---
 
-# Temporary file to hold the sorted list
-list_filename = 'mylist.txt'
+# Temporary directory holding the screenshots as a numbered image sequence,
+# created fresh for each run so no existing folder is ever reused or removed
+frames_prefix = 'timelapse_frames_'
+frames_pattern = 'f%07d.png'
 
-# Regex to find the timestamp in the filename
-timestamp_regex = re.compile(r'(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})')
+# Scan results from the previous run, keyed by directory and its mtime
+cache_filename = '.timelapse_cache.json'
+cache_version = 1
+# Folders modified this close to a scan are not trusted (FAT stores mtimes to 2 seconds)
+cache_racy_window_ns = 2 * 10**9
 
-def check_encoder_available(encoder_name):
-    """Check if a specific FFmpeg encoder is available."""
+# Regex to find the timestamp in the filename, for names not in RuneLite's usual layout
+# RuneLite writes "<optional prefix> YYYY-MM-DD_HH-MM-SS.png", so the timestamp
+# normally sits at a fixed offset from the end of the name
+timestamp_regex = re.compile(r'\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}')
+timestamp_offset = len('YYYY-MM-DD_HH-MM-SS.png')
+
+# Speed presets each encoder accepts, with the default and tune used for it
+encoder_presets = {
+    'libx264': (
+        ('ultrafast', 'superfast', 'veryfast', 'faster', 'fast',
+         'medium', 'slow', 'slower', 'veryslow', 'placebo'),
+        'veryfast',
+        # Screenshots are still frames, each held for several output frames
+        'stillimage',
+    ),
+    'h264_nvenc': (
+        ('p1', 'p2', 'p3', 'p4', 'p5', 'p6', 'p7',
+         # Legacy names, still accepted by h264_nvenc
+         'default', 'slow', 'medium', 'fast', 'hp', 'hq', 'bd',
+         'll', 'llhq', 'llhp', 'lossless', 'losslesshp'),
+        'p4',
+        'hq',
+    ),
+}
+
+@lru_cache(maxsize=None)
+def get_ffmpeg_components(listing):
+    """Query FFmpeg once for the names in one of its listings ('-encoders', '-filters')."""
     try:
         result = subprocess.run(
-            ['ffmpeg', '-hide_banner', '-encoders'],
+            ['ffmpeg', '-hide_banner', listing],
             capture_output=True,
             text=True,
             check=True
         )
-        return encoder_name in result.stdout
     except Exception:
-        return False
+        return frozenset()
+    # Each entry line looks like " V....D libx264   libx264 H.264 ..."
+    return frozenset(
+        parts[1] for parts in map(str.split, result.stdout.splitlines()) if len(parts) > 1
+    )
+
+def check_encoder_available(encoder_name):
+    """Check if a specific FFmpeg encoder is available."""
+    return encoder_name in get_ffmpeg_components('-encoders')
+
+def check_filter_available(filter_name):
+    """Check if a specific FFmpeg filter is available."""
+    return filter_name in get_ffmpeg_components('-filters')
 
 def get_video_encoder():
     """Determine the best video encoder to use based on user preference and availability."""
@@ -127,47 +188,278 @@ def get_audio_duration(filepath):
         'ffprobe',
         '-v', 'error',
         '-show_entries', 'format=duration',
-        '-of', 'json',
+        '-of', 'default=noprint_wrappers=1:nokey=1',
         filepath
     ]
     try:
-        result = subprocess.run(command, check=True, capture_output=True, text=True)
-        data = json.loads(result.stdout)
-        return float(data['format']['duration'])
+        # Output is just the duration in seconds, e.g. "123.456"
+        result = subprocess.run(command, check=True, capture_output=True, text=True, timeout=30)
+        return float(result.stdout.strip())
     except Exception as e:
         print(f"Warning: Could not get duration of {filepath}. {e}")
         print("Install ffprobe (usually with ffmpeg) to use 'hold_last_frame' correctly.")
         return 0
 
+def scan_dir(directory):
+    """List one directory, returning its .png files as (path, name) and its subdirectories."""
+    pngs = []
+    subdirs = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                # Skip hidden folders such as .git or .cache
+                if not entry.name.startswith('.'):
+                    subdirs.append(entry.path)
+            elif entry.name.endswith('.png') and entry.is_file():
+                pngs.append((entry.path, entry.name))
+    return pngs, subdirs
+
+def parse_screenshots(pngs):
+    """Pick out the timestamped screenshots among (path, name) pairs.
+
+    Returns the (path, timestamp) pairs sorted by timestamp, and the number of
+    .png files skipped for having no timestamp.
+    """
+    files_with_times = []
+    skipped_pngs = 0
+    
+    for filepath, filename in pngs:
+        # Fast path for RuneLite's own layout, without the regex engine:
+        # the separators of YYYY-MM-DD_HH-MM-SS sit at every third character from index 4,
+        # with ASCII digits in every field between them
+        timestamp_str = filename[-timestamp_offset:-4]
+        if (len(timestamp_str) == 19 and timestamp_str.isascii()
+                and timestamp_str[4::3] == '--_--'
+                and timestamp_str[:4].isdecimal() and timestamp_str[5:7].isdecimal()
+                and timestamp_str[8:10].isdecimal() and timestamp_str[11:13].isdecimal()
+                and timestamp_str[14:16].isdecimal() and timestamp_str[17:19].isdecimal()):
+            files_with_times.append((filepath, timestamp_str))
+            continue
+        
+        # Otherwise search the whole name for a timestamp
+        match = timestamp_regex.search(filename)
+        
+        # YYYY-MM-DD_HH-MM-SS sorts lexicographically in chronological order
+        if match:
+            files_with_times.append((filepath, match.group(0)))
+        else:
+            skipped_pngs += 1
+    
+    files_with_times.sort(key=itemgetter(1))
+    return files_with_times, skipped_pngs
+
+def read_screenshot_dir(directory, cache, scanned):
+    """Return the scan result for one directory, reusing its cache entry if still current.
+
+    A directory's mtime changes whenever an entry is added, removed or renamed
+    in it, so an unchanged mtime means its listing can be reused without
+    scanning it again. The result is recorded in scanned for the next cache.
+    """
+    result = cache.get(directory)
+    try:
+        mtime = os.stat(directory).st_mtime_ns
+        if result is None or result['mtime'] != mtime:
+            pngs, subdirs = scan_dir(directory)
+            files_with_times, skipped_pngs = parse_screenshots(pngs)
+            result = {
+                'mtime': mtime,
+                'subdirs': subdirs,
+                'frames': files_with_times,
+                'skipped': skipped_pngs,
+            }
+    except OSError as e:
+        # Skip unreadable folders, as os.walk does, without caching them
+        print(f"Warning: Skipping unreadable folder {directory}. {e}")
+        return {'mtime': None, 'subdirs': [], 'frames': [], 'skipped': 0}
+    scanned[directory] = result
+    return result
+
+def collect_screenshots(root, cache, scanned, recursive=True):
+    """Find timestamped screenshots under root (or only directly in it).
+
+    Returns a list of per-directory lists of (path, timestamp), each sorted by
+    timestamp, and the number of .png files skipped for having no timestamp.
+    """
+    per_dir_sorted = []
+    skipped_pngs = 0
+    
+    stack = deque([root])
+    while stack:
+        result = read_screenshot_dir(stack.pop(), cache, scanned)
+        if result['frames']:
+            per_dir_sorted.append(result['frames'])
+        skipped_pngs += result['skipped']
+        if recursive:
+            stack.extend(result['subdirs'])
+    
+    return per_dir_sorted, skipped_pngs
+
+def collect_screenshots_parallel(root, cache, scanned):
+    """Like collect_screenshots, but scans each top-level subfolder of root in its own thread.
+
+    os.scandir releases the GIL while listing, so separate account folders
+    (possibly on separate drives) are walked concurrently.
+    """
+    result = read_screenshot_dir(root, cache, scanned)
+    per_dir_sorted = [result['frames']] if result['frames'] else []
+    skipped_pngs = result['skipped']
+    
+    with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as executor:
+        results = executor.map(lambda subdir: collect_screenshots(subdir, cache, scanned), result['subdirs'])
+        for subdir_sorted, subdir_skipped in results:
+            per_dir_sorted.extend(subdir_sorted)
+            skipped_pngs += subdir_skipped
+    
+    return per_dir_sorted, skipped_pngs
+
+def load_scan_cache():
+    """Load the per-directory scan results saved by the previous run."""
+    try:
+        with open(cache_filename, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') == cache_version:
+            return data['dirs']
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Warning: Ignoring unreadable scan cache {cache_filename}. {e}")
+    return {}
+
+def save_scan_cache(scanned, cache, scan_started_ns):
+    """Save this run's per-directory scan results for the next run, if they changed.
+
+    A screenshot saved in the same mtime tick as a folder was listed would
+    not change that folder's mtime, so folders modified shortly before the
+    scan began are saved without an mtime and always rescanned next time.
+    """
+    if scanned == cache:
+        return
+    racy_after_ns = scan_started_ns - cache_racy_window_ns
+    dirs = {
+        directory: dict(result, mtime=None) if result['mtime'] >= racy_after_ns else result
+        for directory, result in scanned.items()
+    }
+    try:
+        with open(cache_filename + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'version': cache_version, 'dirs': dirs}, f)
+        os.replace(cache_filename + '.tmp', cache_filename)
+    except OSError as e:
+        print(f"Warning: Could not save scan cache {cache_filename}. {e}")
+
+def link_frame(src, dst):
+    """Hardlink src to dst, or symlink it when hardlinks aren't possible (e.g. across filesystems)."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        os.symlink(os.path.abspath(src), dst)
+
+def link_frames(files_with_times):
+    """Link the sorted screenshots into a new temporary folder as a numbered sequence.
+
+    Hardlinks are used where possible (no data is copied), falling back to
+    symlinks when the screenshots live on another filesystem. Returns the
+    folder's path, or None if the sequence could not be built.
+    """
+    frames_dir = None
+    # Links are made one at a time: every create takes the same parent
+    # directory lock, so a thread pool only adds overhead
+    try:
+        frames_dir = tempfile.mkdtemp(prefix=frames_prefix, dir='.')
+        for i, (filepath, timestamp_str) in enumerate(files_with_times):
+            link_frame(filepath, os.path.join(frames_dir, frames_pattern % i))
+    except OSError as e:
+        print(f"Warning: Could not link screenshots into a temporary folder. {e}")
+        if frames_dir:
+            shutil.rmtree(frames_dir, ignore_errors=True)
+        return None
+    return frames_dir
+
+def copy_to_pipe(src, pipe):
+    """Copy an open file into a pipe, in the kernel where the OS allows it."""
+    if sys.platform.startswith('linux'):
+        size = os.fstat(src.fileno()).st_size
+        offset = 0
+        while offset < size:
+            sent = os.sendfile(pipe.fileno(), src.fileno(), offset, size - offset)
+            if sent == 0:
+                break
+            offset += sent
+    else:
+        shutil.copyfileobj(src, pipe, 1 << 20)
+
+def pipe_frames(ffmpeg_command, files_with_times):
+    """Run FFmpeg, streaming each screenshot's bytes into its stdin in order."""
+    process = subprocess.Popen(ffmpeg_command, stdin=subprocess.PIPE)
+    try:
+        for filepath, timestamp_str in files_with_times:
+            try:
+                src = open(filepath, 'rb')
+            except OSError as e:
+                # Deleted or moved since the scan; FFmpeg just gets one frame fewer
+                print(f"Warning: Skipping screenshot that can no longer be read. {e}")
+                continue
+            with src:
+                copy_to_pipe(src, process.stdin)
+    except BrokenPipeError:
+        # FFmpeg stopped reading; its exit code below says why
+        pass
+    finally:
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        process.wait()
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, ffmpeg_command)
+
+def get_glob_dir(per_dir_sorted, skipped_pngs):
+    """Return the directory whose '*.png' glob yields exactly the screenshots, in order.
+
+    Returns None when a glob would pick up other files, miss some, or expand
+    them in a different order than the sorted timestamps.
+    """
+    # FFmpeg's Windows builds have no glob support
+    if os.name == 'nt' or skipped_pngs or len(per_dir_sorted) != 1:
+        return None
+    files_with_times = per_dir_sorted[0]
+    common_dir = os.path.dirname(files_with_times[0][0])
+    # FFmpeg globs with GLOB_BRACE, so braces are special too
+    if any(c in common_dir for c in '*?[]{}\\'):
+        return None
+    
+    paths = [filepath for filepath, timestamp_str in files_with_times]
+    # glob never matches hidden files
+    if any(os.path.basename(path).startswith('.') for path in paths):
+        return None
+    # glob expands in name order, which must match the chronological order
+    if any(a > b for a, b in zip(paths, paths[1:])):
+        return None
+    return common_dir
+
 def create_timelapse():
-    print("Finding and sorting all screenshots in all subfolders...")
+    if recursive:
+        print("Finding and sorting all screenshots in all subfolders...")
+    else:
+        print("Finding and sorting all screenshots...")
     
     # Determine video encoder
     video_codec = get_video_encoder()
     
-    files_with_times = []
-    
-    for root, dirs, files in os.walk(screenshots_dir):
-        for filename in files:
-            if filename.endswith('.png'):
-                match = timestamp_regex.search(filename)
-                
-                if match:
-                    timestamp_str = match.group(1)
-                    try:
-                        timestamp_obj = datetime.strptime(timestamp_str, '%Y-%m-%d_%H-%M-%S')
-                        filepath = os.path.join(root, filename)
-                        files_with_times.append((filepath, timestamp_obj))
-                    except ValueError:
-                        print(f"Skipping file with weird date: {filename}")
-
-    files_with_times.sort(key=lambda x: x[1])
-
-    if not files_with_times:
+    # Directories unchanged since the last run are taken from the scan cache
+    cache = load_scan_cache()
+    scanned = {}
+    scan_started_ns = time.time_ns()
+    if recursive and parallel_scan:
+        per_dir_sorted, skipped_pngs = collect_screenshots_parallel(screenshots_dir, cache, scanned)
+    else:
+        per_dir_sorted, skipped_pngs = collect_screenshots(screenshots_dir, cache, scanned, recursive)
+    save_scan_cache(scanned, cache, scan_started_ns)
+
+    if not per_dir_sorted:
         print("Error: No .png files with valid RuneLite timestamps found.")
         return
         
-    total_images = len(files_with_times)
+    total_images = sum(map(len, per_dir_sorted))
     video_duration = total_images / framerate
     padding_duration = 0
     has_music = music_file and os.path.exists(music_file)
@@ -184,21 +476,59 @@ def create_timelapse():
         else:
             print(f"Music is {music_duration:.2f}s. No padding needed.")
 
-    with open(list_filename, 'w', encoding='utf-8') as f:
-        for filepath, timestamp_obj in files_with_times:
-            escaped_path = filepath.replace("'", "'\\''")
-            f.write(f"file '{escaped_path}'\n")
+    # On NVENC, composite the blurred chatbox on the GPU so each frame is
+    # uploaded once and stays in device memory through to the encoder
+    gpu_overlay = (
+        blur_box is not None
+        and video_codec == 'h264_nvenc'
+        and check_filter_available('overlay_cuda')
+    )
 
-    print("File list created. Starting FFmpeg to build video...")
+    # Without blur or padding the graph is one linear chain, so a plain -vf
+    # filter is enough and the input video stream is mapped directly
+    simple_graph = not blur_box and padding_duration == 0
 
-    # Base command with video input
+    # Base command, letting the filter graph use every available core; -vf and
+    # -filter_complex graphs each take their own thread option
     ffmpeg_command = [
         'ffmpeg',
-        '-r', str(framerate),
-        '-f', 'concat',
-        '-safe', '0',
-        '-i', list_filename,
+        '-filter_threads' if simple_graph else '-filter_complex_threads',
+        str(os.cpu_count() or 1),
     ]
+    if gpu_overlay:
+        ffmpeg_command.extend(['-init_hw_device', 'cuda=gpu', '-filter_hw_device', 'gpu'])
+
+    # Prefer letting the image2 demuxer read the screenshots itself: glob them
+    # directly when they already sit in name order in one folder, otherwise
+    # link them into a numbered sequence, and only fall back to piping them.
+    # Each directory is already sorted, so heapq.merge orders all N screenshots
+    # in O(N log K) for K directories without building one combined list
+    glob_dir = get_glob_dir(per_dir_sorted, skipped_pngs)
+    frames_dir = None if glob_dir else link_frames(heapq.merge(*per_dir_sorted, key=itemgetter(1)))
+    frames_to_pipe = None
+    if glob_dir:
+        print("Screenshots are already in order. Starting FFmpeg to build video...")
+        ffmpeg_command.extend([
+            '-framerate', str(framerate),
+            '-pattern_type', 'glob',
+            '-i', os.path.join(glob_dir, '*.png'),
+        ])
+    elif frames_dir:
+        print("Image sequence created. Starting FFmpeg to build video...")
+        ffmpeg_command.extend([
+            '-framerate', str(framerate),
+            '-i', os.path.join(frames_dir, frames_pattern),
+        ])
+    else:
+        # Stream the screenshots through a pipe, so no list file is needed
+        print("Starting FFmpeg to build video from piped screenshots...")
+        frames_to_pipe = heapq.merge(*per_dir_sorted, key=itemgetter(1))
+        ffmpeg_command.extend([
+            '-f', 'image2pipe',
+            '-framerate', str(framerate),
+            '-c:v', 'png',
+            '-i', '-',
+        ])
 
     # Add music & duration logic
     if has_music:
@@ -220,42 +550,84 @@ def create_timelapse():
     # Scale all images to the target output resolution
     # Use 'increase' to fill the frame (will crop if aspect ratio doesn't match)
     # This ensures blur coordinates are always in the correct position
-    filter_chain.append(f"{video_stream_in}scale={output_width}:{output_height}:force_original_aspect_ratio=increase,crop={output_width}:{output_height}[v_scaled]")
+    # Encoders need even dimensions, so round down here once rather than
+    # running a second crop over every frame at the end of the chain
+    even_width = output_width // 2 * 2
+    even_height = output_height // 2 * 2
+    scale_filter = f"scale={output_width}:{output_height}:force_original_aspect_ratio=increase,crop={even_width}:{even_height}"
+    filter_chain.append(f"{video_stream_in}{scale_filter}[v_scaled]")
     video_stream_in = "[v_scaled]"
     
+    # tpad can't clone frames once they are on the GPU, so pad before uploading
+    if padding_duration > 0 and gpu_overlay:
+        filter_chain.append(f"{video_stream_in}tpad=stop_mode=clone:stop_duration={padding_duration}[v_padded]")
+        video_stream_in = "[v_padded]"
+    
     if blur_box:
-        print(f"Applying blur to chatbox at position ({blur_box['x']}, {blur_box['y']}) with size {blur_box['w']}x{blur_box['h']}")
         b = blur_box
-        filter_chain.append(
-            f"{video_stream_in}split[main][to_blur]; "
-            f"[to_blur]crop={b['w']}:{b['h']}:{b['x']}:{b['y']},"
-            f"gblur=sigma={blur_amount}[blurred_box]; "
-            f"[main][blurred_box]overlay={b['x']}:{b['y']}[v_blurred]"
-        )
+        if gpu_overlay:
+            # NV12 is 4:2:0, so crop would silently round an odd box down to even
+            # and misalign it against overlay_cuda; use an even box throughout
+            b = {key: max(2, value // 2 * 2) if key in ('w', 'h') else value // 2 * 2
+                 for key, value in blur_box.items()}
+        print(f"Applying blur to chatbox at position ({b['x']}, {b['y']}) with size {b['w']}x{b['h']}")
+        if blur_downscale > 1:
+            # Shrinking the box is itself a low-pass filter; stretching it back
+            # smears the result, for a fraction of the cost of a real blur
+            blur_filter = (
+                f"scale={max(1, b['w'] // blur_downscale)}:{max(1, b['h'] // blur_downscale)},"
+                f"scale={b['w']}:{b['h']}:flags=bilinear"
+            )
+        else:
+            # boxblur is much cheaper than gblur and hides the text just as well;
+            # its radius must fit inside the (possibly chroma-subsampled) box
+            radius = min(blur_amount, b['w'] // 4, b['h'] // 4)
+            blur_filter = f"boxblur=luma_radius={radius}:luma_power=2:chroma_radius={radius}:chroma_power=2"
+        if gpu_overlay:
+            print("Compositing the blurred chatbox on the GPU (overlay_cuda)")
+            filter_chain.append(
+                f"{video_stream_in}format=nv12,split[main][to_blur]; "
+                f"[to_blur]crop={b['w']}:{b['h']}:{b['x']}:{b['y']},"
+                f"{blur_filter},format=nv12,hwupload[blurred_box]; "
+                f"[main]hwupload[main_gpu]; "
+                f"[main_gpu][blurred_box]overlay_cuda={b['x']}:{b['y']}[v_blurred]"
+            )
+        else:
+            filter_chain.append(
+                f"{video_stream_in}split[main][to_blur]; "
+                f"[to_blur]crop={b['w']}:{b['h']}:{b['x']}:{b['y']},"
+                f"{blur_filter}[blurred_box]; "
+                f"[main][blurred_box]overlay={b['x']}:{b['y']}[v_blurred]"
+            )
         video_stream_in = "[v_blurred]"
     
     # Define the output name for the next filter step
     next_output = "[v_out]" if padding_duration == 0 else "[v_padded]"
     
     # Add padding filter if needed (before fps to ensure last frame is cloned properly)
-    if padding_duration > 0:
+    if padding_duration > 0 and not gpu_overlay:
         filter_chain.append(f"{video_stream_in}tpad=stop_mode=clone:stop_duration={padding_duration}[v_padded]")
         video_stream_in = "[v_padded]"
     
-    # Apply fps filter and crop to even dimensions last
-    filter_chain.append(f"{video_stream_in}fps={output_fps},crop=floor(iw/2)*2:floor(ih/2)*2[v_out]")
+    # Apply fps filter last
+    finish_filter = f"fps={output_fps}"
+    filter_chain.append(f"{video_stream_in}{finish_filter}[v_out]")
 
-    ffmpeg_command.extend(['-filter_complex', ";".join(filter_chain)])
+    if simple_graph:
+        ffmpeg_command.extend(['-vf', f"{scale_filter},{finish_filter}"])
+        ffmpeg_command.extend(['-map', '0:v:0'])
+    else:
+        ffmpeg_command.extend(['-filter_complex', ";".join(filter_chain)])
+        ffmpeg_command.extend(['-map', '[v_out]'])
 
     # Map final streams
-    ffmpeg_command.extend(['-map', '[v_out]'])
     if has_music:
         ffmpeg_command.extend(['-map', '1:a:0'])
         ffmpeg_command.extend(['-c:a', 'aac'])
         if not hold_last_frame:
             ffmpeg_command.append('-shortest')
-    # Add final output settings
-    ffmpeg_command.extend(['-c:v', video_codec])
+    # Add final output settings (-threads 0 lets the encoder pick its thread count)
+    ffmpeg_command.extend(['-threads', '0', '-c:v', video_codec])
     
     # Add quality settings based on encoder type
     if video_codec == 'libx264':
@@ -265,23 +637,39 @@ def create_timelapse():
         # GPU encoders use CQ (Constant Quality) 
         ffmpeg_command.extend(['-cq', video_quality])
     
+    # Add speed presets; x264's default 'medium' is far slower than needed here
+    if video_codec in encoder_presets:
+        presets, preset, tune = encoder_presets[video_codec]
+        if video_preset in presets:
+            preset = video_preset
+        elif video_preset:
+            # e.g. a CPU preset set in .env, but auto-detection picked NVENC
+            print(f"Warning: VIDEO_PRESET '{video_preset}' is not a {video_codec} preset. Using '{preset}'.")
+        ffmpeg_command.extend(['-preset', preset, '-tune', tune])
+    
+    # GPU frames are already NV12 and go to NVENC as-is
+    if not gpu_overlay:
+        ffmpeg_command.extend(['-pix_fmt', 'yuv420p'])
+    
     ffmpeg_command.extend([
-        '-pix_fmt', 'yuv420p',
         '-y',
         output_video
     ])
     
     try:
-        subprocess.run(ffmpeg_command, check=True)
+        if frames_to_pipe is not None:
+            pipe_frames(ffmpeg_command, frames_to_pipe)
+        else:
+            subprocess.run(ffmpeg_command, check=True)
         print(f"\nSuccess! Timelapse created: {output_video}")
     except subprocess.CalledProcessError as e:
         print(f"\nError: FFmpeg failed with exit code {e.returncode}")
     except FileNotFoundError as e:
         print(f"\nError: Command not found. Is FFmpeg/FFprobe installed? {e}")
     finally:
-        if os.path.exists(list_filename):
-            os.remove(list_filename)
-            print(f"Cleaned up {list_filename}.")
+        if frames_dir:
+            shutil.rmtree(frames_dir, ignore_errors=True)
+            print(f"Cleaned up {frames_dir}.")
 
 if __name__ == "__main__":
     print("=" * 60)